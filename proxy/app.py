@@ -36,6 +36,8 @@ def sha256_prefix(s):
     return "sha256:" + hashlib.sha256(s.encode()).hexdigest()[:40]
 
 def build_record(trace_id, req, resp, sql_comment_added):
+    # requests stamped by the orchestrator carry X-Payload-ID; everything else is manual traffic
+    tool = "orchestrator" if req.headers.get("X-Payload-ID") else "manual"
     params = []
     for i, (k, v) in enumerate(req.args.items()):
         params.append({
@@ -55,18 +57,22 @@ def build_record(trace_id, req, resp, sql_comment_added):
             "body_snippet": (req.get_data()[:512].decode(errors='ignore') if req.get_data() else None),
             "client_ip": req.remote_addr
         },
-        "payload": {"payload_id": None, "category": None, "vector": None, "template_ref": None, "raw_payload_redacted": None},
+        "payload": {
+            "payload_id": req.headers.get("X-Payload-ID"),
+            "category": req.headers.get("X-Payload-Category"),
+            "vector": None, "template_ref": None, "raw_payload_redacted": None
+        },
         "response": {
             "status": resp.status_code,
             "size_bytes": len(resp.content) if resp.content else 0,
             "content_hash": sha256_prefix(resp.text[:1024]),
             "key_substrings": [],
-            "response_time_ms": 0.0,
+            "response_time_ms": round(resp.elapsed.total_seconds() * 1000, 2),
             "semantic_diff_score": 0.0
         },
         "db": None,
         "outcome": {"success_confidence": 0.0, "data_extracted_count": 0, "notes": ""},
-        "meta": {"tool": "manual", "tool_version": None, "round": "manual", "annotations": []},
+        "meta": {"tool": tool, "tool_version": None, "round": tool, "annotations": []},
         "injected_sql_comment": sql_comment_added
     }
     return rec
@@ -1,4 +1,5 @@
 import json
+import os
 
 http_traces = {}
 with open("./logs/traces.jl") as f:
@@ -6,10 +7,21 @@ with open("./logs/traces.jl") as f:
         d = json.loads(line)
         http_traces[d["trace_id"]] = d
 
+# orchestrator results carry the same trace_id they sent as X-Trace-ID
+results = {}
+if os.path.exists("./sqli_results.jsonl"):
+    with open("./sqli_results.jsonl") as f:
+        for line in f:
+            d = json.loads(line)
+            if d.get("trace_id"):
+                results[d["trace_id"]] = d
+
 with open("./logs/db_traces_normalized.jsonl") as f, open("./logs/combined_trace.jsonl", "w") as out:
     for line in f:
         d = json.loads(line)
         trace_id = d.get("trace_id")
         if trace_id and trace_id in http_traces:
             combined = {**http_traces[trace_id], **d}
+            if trace_id in results:
+                combined["result"] = results[trace_id]
             out.write(json.dumps(combined) + "\n")
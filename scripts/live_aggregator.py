@@ -0,0 +1,377 @@
+#!/usr/bin/env python3
+"""
+Incrementally aggregate orchestrator results and proxy traces into live stats.
+
+Tails sqli_results.jsonl and logs/traces.jl, keeps rolling per-minute counters
+(findings per id / payload family, status-code mix, latency percentiles, proxy
+throughput) and checkpoints read offsets + state so a restart only reads new data.
+
+Usage:
+  python3 scripts/live_aggregator.py --results sqli_results.jsonl --traces logs/traces.jl --port 8090
+  # then open http://localhost:8090/ (HTML) or http://localhost:8090/status.json
+
+  # one-shot: catch up, print the status JSON and exit
+  python3 scripts/live_aggregator.py --once
+"""
+import os
+import sys
+import json
+import math
+import time
+import argparse
+import threading
+from html import escape
+from collections import Counter
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from utils.time_utils import to_epoch  # noqa: E402
+
+RESULTS_LOG = "sqli_results.jsonl"
+HTTP_LOG = "logs/traces.jl"
+STATE_FILE = "logs/aggregator_state.json"
+WINDOW_MINUTES = 15
+POLL_INTERVAL = 1.0      # seconds
+CHECKPOINT_EVERY = 10.0  # seconds
+MAX_SKEW = 120.0         # seconds an event may be stamped ahead of the local clock
+
+# -------------------------
+# Latency histogram
+# -------------------------
+class LatencyHistogram:
+    """
+    HDR-style log-bucketed histogram: bucket i covers (GAMMA^(i-1), GAMMA^i] ms.
+    Percentiles report the bucket's geometric midpoint GAMMA^(i-1/2), so they are
+    within ~2.5% relative error, in O(#buckets) memory.
+    Buckets are plain ints -> mergeable and JSON serializable.
+    """
+    GAMMA = 1.05
+
+    def __init__(self, buckets=None):
+        self.buckets = Counter({int(k): v for k, v in (buckets or {}).items()})
+
+    def add(self, ms):
+        if ms is None or ms < 0:
+            return
+        idx = 0 if ms <= 1 else math.ceil(math.log(ms, self.GAMMA))
+        self.buckets[idx] += 1
+
+    def merge(self, other):
+        self.buckets.update(other.buckets)
+
+    def count(self):
+        return sum(self.buckets.values())
+
+    def percentile(self, p):
+        total = self.count()
+        if not total:
+            return None
+        rank = p / 100.0 * total
+        seen = 0
+        for idx in sorted(self.buckets):
+            seen += self.buckets[idx]
+            if seen >= rank:
+                return round(self.GAMMA ** (idx - 0.5), 2)
+        return round(self.GAMMA ** (max(self.buckets) - 0.5), 2)
+
+    def to_dict(self):
+        return {str(k): v for k, v in self.buckets.items()}
+
+# -------------------------
+# Rolling aggregation state
+# -------------------------
+def new_bucket():
+    return {
+        "results": 0,
+        "findings": 0,
+        "findings_by_id": Counter(),
+        "findings_by_family": Counter(),
+        "verdicts": Counter(),
+        "status_codes": Counter(),
+        "proxy_requests": 0,
+        "proxy_status_codes": Counter(),
+        "latency": LatencyHistogram(),
+        "proxy_latency": LatencyHistogram(),
+    }
+
+def bucket_to_json(b):
+    out = {}
+    for k, v in b.items():
+        out[k] = v.to_dict() if isinstance(v, LatencyHistogram) else (dict(v) if isinstance(v, Counter) else v)
+    return out
+
+def bucket_from_json(d):
+    b = new_bucket()
+    for k, v in d.items():
+        if isinstance(b.get(k), LatencyHistogram):
+            b[k] = LatencyHistogram(v)
+        elif isinstance(b.get(k), Counter):
+            b[k] = Counter(v)
+        else:
+            b[k] = v
+    return b
+
+def merge_bucket(into, b):
+    for k, v in b.items():
+        if isinstance(v, LatencyHistogram):
+            into[k].merge(v)
+        elif isinstance(v, Counter):
+            into[k].update(v)
+        else:
+            into[k] += v
+
+class Aggregator:
+    def __init__(self, results_path=RESULTS_LOG, traces_path=HTTP_LOG, state_path=STATE_FILE, window_minutes=WINDOW_MINUTES,
+                 clock=time.time):
+        self.state_path = state_path
+        self.window_minutes = window_minutes
+        self.clock = clock
+        self.lock = threading.Lock()
+        # per-file tail position: offset + inode to notice rotation/truncation
+        self.sources = {
+            "results": {"path": results_path, "offset": 0, "inode": None},
+            "traces": {"path": traces_path, "offset": 0, "inode": None},
+        }
+        self.windows = {}          # minute (epoch // 60) -> bucket
+        self.totals = new_bucket()
+        self.future_events = 0     # events stamped beyond now + MAX_SKEW (kept out of the window)
+        self.load_checkpoint()
+
+    # --- checkpointing ---
+    def load_checkpoint(self):
+        if not os.path.exists(self.state_path):
+            return
+        try:
+            with open(self.state_path, "r", encoding="utf-8") as f:
+                st = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"[!] Ignoring unreadable checkpoint {self.state_path}: {e}")
+            return
+        for name, src in st.get("sources", {}).items():
+            if name in self.sources and src.get("path") == self.sources[name]["path"]:
+                self.sources[name].update(offset=src["offset"], inode=src["inode"])
+        self.windows = {int(m): bucket_from_json(b) for m, b in st.get("windows", {}).items()}
+        self.totals = bucket_from_json(st.get("totals", {}))
+        self.future_events = st.get("future_events", 0)
+        self._prune()
+
+    def checkpoint(self):
+        with self.lock:
+            st = {
+                "saved_at": time.time(),
+                "sources": self.sources,
+                "windows": {str(m): bucket_to_json(b) for m, b in self.windows.items()},
+                "totals": bucket_to_json(self.totals),
+                "future_events": self.future_events,
+            }
+        os.makedirs(os.path.dirname(self.state_path) or ".", exist_ok=True)
+        tmp = self.state_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(st, f, separators=(",", ":"))
+        os.replace(tmp, self.state_path)
+
+    # --- tailing ---
+    def _read_new_lines(self, src):
+        """Yield complete lines appended since the last call; partial tail lines wait for the next poll."""
+        path = src["path"]
+        if not os.path.exists(path):
+            return
+        st = os.stat(path)
+        if st.st_ino != src["inode"] or st.st_size < src["offset"]:
+            # new, rotated or truncated file: start over
+            src["inode"], src["offset"] = st.st_ino, 0
+        if st.st_size == src["offset"]:
+            return
+        with open(path, "rb") as f:
+            f.seek(src["offset"])
+            for raw in f:
+                if not raw.endswith(b"\n"):
+                    break
+                src["offset"] += len(raw)
+                yield raw
+
+    def poll(self):
+        """Consume new data from all sources; returns number of records processed."""
+        n = 0
+        for name, handler in (("results", self._add_result), ("traces", self._add_trace)):
+            for raw in self._read_new_lines(self.sources[name]):
+                try:
+                    rec = json.loads(raw)
+                except ValueError:
+                    continue
+                with self.lock:
+                    handler(rec)
+                n += 1
+        if n:
+            with self.lock:
+                self._prune()
+        return n
+
+    def _buckets_for(self, ts):
+        """Buckets an event counts towards: totals always, its minute only if inside the window."""
+        now = self.clock()
+        epoch = to_epoch(ts)
+        if epoch is None:
+            epoch = now
+        elif epoch > now + MAX_SKEW:
+            # e.g. epoch in ms: never let it pin the window
+            self.future_events += 1
+            return (self.totals,)
+        minute = min(int(epoch // 60), int(now // 60))
+        first, _ = self._window_bounds()
+        if minute < first:
+            # history older than the window (catch-up): don't materialize buckets for it
+            return (self.totals,)
+        if minute not in self.windows:
+            self.windows[minute] = new_bucket()
+        return self.windows[minute], self.totals
+
+    def _add_result(self, r):
+        for b in self._buckets_for(r.get("timestamp")):
+            b["results"] += 1
+            b["verdicts"][r.get("verdict", "unknown")] += 1
+            b["status_codes"][str(r.get("status_code"))] += 1
+            b["latency"].add(r.get("elapsed_ms"))
+            if str(r.get("verdict", "")).startswith("POSSIBLE"):
+                b["findings"] += 1
+                b["findings_by_id"][str(r.get("id_param"))] += 1
+                b["findings_by_family"][r.get("category") or "unknown"] += 1
+
+    def _add_trace(self, t):
+        resp = t.get("response") or {}
+        for b in self._buckets_for(t.get("timestamp")):
+            b["proxy_requests"] += 1
+            b["proxy_status_codes"][str(resp.get("status"))] += 1
+            b["proxy_latency"].add(resp.get("response_time_ms"))
+
+    def _window_bounds(self):
+        """(first, last) minute of the rolling window, from the wall clock only."""
+        last = int(self.clock() // 60)
+        return last - self.window_minutes + 1, last
+
+    def _prune(self):
+        first, last = self._window_bounds()
+        for m in [m for m in self.windows if m < first or m > last]:
+            del self.windows[m]
+
+    # --- reporting ---
+    def _summarize(self, b, span_seconds):
+        return {
+            "results": b["results"],
+            "findings": b["findings"],
+            "findings_by_id": dict(b["findings_by_id"].most_common()),
+            "findings_by_family": dict(b["findings_by_family"].most_common()),
+            "verdicts": dict(b["verdicts"]),
+            "status_codes": dict(b["status_codes"]),
+            "latency_ms": {f"p{p}": b["latency"].percentile(p) for p in (50, 90, 99)},
+            "proxy_requests": b["proxy_requests"],
+            "proxy_rps": round(b["proxy_requests"] / span_seconds, 3) if span_seconds else None,
+            "proxy_status_codes": dict(b["proxy_status_codes"]),
+            "proxy_latency_ms": {f"p{p}": b["proxy_latency"].percentile(p) for p in (50, 90, 99)},
+        }
+
+    def status(self):
+        with self.lock:
+            now = self.clock()
+            self._prune()  # expire old minutes even when no new data arrives
+            first, _ = self._window_bounds()
+            window = new_bucket()
+            for b in self.windows.values():
+                merge_bucket(window, b)
+            # span actually covered: from the window start (or the first data seen) to now
+            start = max(first, min(self.windows, default=first)) * 60
+            end = now
+            return {
+                "generated_at": now,
+                "window_minutes": self.window_minutes,
+                "window_start": start,
+                "window_end": end,
+                "window": self._summarize(window, max(end - start, 1.0)),
+                "totals": self._summarize(self.totals, None),
+                "future_events": self.future_events,
+                "offsets": {k: v["offset"] for k, v in self.sources.items()},
+            }
+
+# -------------------------
+# Status page
+# -------------------------
+HTML_PAGE = """<!doctype html>
+<html><head><meta charset="utf-8"><meta http-equiv="refresh" content="5">
+<title>Automated-SQLi live status</title>
+<style>body{{font-family:monospace;margin:2em}}table{{border-collapse:collapse}}td,th{{border:1px solid #ccc;padding:2px 8px;text-align:left}}</style>
+</head><body>
+<h2>Automated-SQLi live status</h2>
+<p>Rolling window: last {window_minutes} min, ending {window_end} &middot; <a href="/status.json">status.json</a></p>
+{tables}
+</body></html>
+"""
+
+def html_table(title, d):
+    rows = "".join(f"<tr><td>{escape(str(k))}</td><td>{escape(json.dumps(v) if isinstance(v, dict) else str(v))}</td></tr>" for k, v in d.items())
+    return f"<h3>{title}</h3><table>{rows}</table>"
+
+def make_handler(agg):
+    class StatusHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            st = agg.status()
+            if self.path.startswith("/status.json"):
+                body, ctype = json.dumps(st, indent=2).encode(), "application/json"
+            elif self.path in ("/", "/index.html"):
+                tables = html_table("Window", st["window"]) + html_table("Totals", st["totals"])
+                window_end = datetime.fromtimestamp(st["window_end"], timezone.utc).isoformat(timespec="seconds").replace("+00:00", "Z")
+                body = HTML_PAGE.format(window_minutes=st["window_minutes"], window_end=window_end, tables=tables).encode()
+                ctype = "text/html; charset=utf-8"
+            else:
+                self.send_error(404)
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", ctype)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, fmt, *args):
+            pass  # keep the console for aggregator output
+    return StatusHandler
+
+def main():
+    p = argparse.ArgumentParser(description="Live aggregation of orchestrator results and proxy traces")
+    p.add_argument("--results", default=RESULTS_LOG, help="orchestrator results jsonl")
+    p.add_argument("--traces", default=HTTP_LOG, help="proxy traces jsonl")
+    p.add_argument("--state", default=STATE_FILE, help="checkpoint file")
+    p.add_argument("--window", type=int, default=WINDOW_MINUTES, help="rolling window in minutes")
+    p.add_argument("--host", default="127.0.0.1")
+    p.add_argument("--port", type=int, default=8090)
+    p.add_argument("--once", action="store_true", help="catch up, print status JSON and exit")
+    args = p.parse_args()
+
+    agg = Aggregator(args.results, args.traces, args.state, args.window)
+
+    if args.once:
+        agg.poll()
+        agg.checkpoint()
+        print(json.dumps(agg.status(), indent=2))
+        return
+
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(agg))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    print(f"[+] Serving status on http://{args.host}:{args.port}/ (ctrl-c to stop)")
+
+    last_cp = time.time()
+    try:
+        while True:
+            if agg.poll():
+                print("[*] offsets: " + ", ".join(f"{k}={v['offset']}" for k, v in agg.sources.items()), end="\r")
+            if time.time() - last_cp >= CHECKPOINT_EVERY:
+                agg.checkpoint()
+                last_cp = time.time()
+            time.sleep(POLL_INTERVAL)
+    except KeyboardInterrupt:
+        print("\nInterrupted.")
+    finally:
+        agg.checkpoint()
+        server.shutdown()
+
+if __name__ == "__main__":
+    main()
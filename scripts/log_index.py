@@ -0,0 +1,419 @@
+#!/usr/bin/env python3
+"""
+Sidecar offset index + mmap reader for random access into JSONL logs
+(logs/traces.jl, logs/db_traces.jsonl, logs/combined_trace.jsonl, ...).
+
+The index lives next to the log as <log>.idx and maps
+  - trace_id hash (8 bytes) -> byte offset of the line (every line with a trace_id)
+  - timestamp -> byte offset (sparse: one entry every N lines)
+Each update indexes only the bytes written since the last run and appends a
+new block. Trailing blocks of similar size are merged (size-tiered, like an
+LSM tree), so the index keeps O(log n) live blocks and each entry is rewritten
+O(log n) times: updates cost amortized O(new data * log n), never a full rewrite.
+The index file is only ever appended to: a merged block is appended after the
+blocks it supersedes, so a crash mid-write leaves the previous blocks intact.
+Superseded bytes are reclaimed by `compact` (tmp file + os.replace) once they
+outweigh the live index, which keeps that cost amortized too.
+A log that was truncated or rewritten in place (different inode, mtime at equal
+size, or changed head/tail bytes) is reindexed from scratch.
+Lookups mmap the log and decode only the matching lines.
+
+Usage:
+  python3 scripts/log_index.py build logs/traces.jl
+  python3 scripts/log_index.py get   logs/traces.jl 8f8b27d2-1abf-4a60-9f78-9e4d45ad00a1
+  python3 scripts/log_index.py range logs/db_traces.jsonl --start 2025-11-09T09:32:00Z --end 2025-11-09T09:33:00Z
+  python3 scripts/log_index.py compact logs/traces.jl
+"""
+import os
+import sys
+import json
+import mmap
+import time
+import struct
+import bisect
+import hashlib
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from utils.time_utils import to_epoch  # noqa: E402
+
+SPARSE_EVERY = 256   # one timestamp entry every N lines
+MERGE_RATIO = 2      # merge the last two blocks while the older one is <= MERGE_RATIO x the newer
+MIN_RECLAIM = 1 << 20  # don't bother compacting away less than 1 MiB of superseded blocks
+FINGERPRINT = 256    # bytes hashed at the head / tail of the indexed region
+
+INF = float("inf")
+
+# Block layout: header, then n_ids sorted (hash, offset) pairs, then n_ts sparse timestamp entries.
+# The header also fingerprints the log it was built from so rewrites are detected.
+# A block whose log start is <= that of earlier blocks supersedes them (it is their merge).
+MAGIC = b"LIX2"
+HEADER = struct.Struct("<4sQQIIddQQQQ")  # magic, log start, log end, n_ids, n_ts, min ts, running max ts,
+                                         # inode, mtime_ns, head hash, tail hash
+ID_ENTRY = struct.Struct("<QQ")          # trace_id hash, line offset
+# Sparse timestamp entries carry monotone keys so range scans stay exact on out-of-order logs:
+#   max_before: max timestamp of every line before this offset (whole log)
+#   min_after:  min timestamp of every line from this offset to the end of the block
+TS_ENTRY = struct.Struct("<ddQ")         # max_before, min_after, line offset
+
+def trace_hash(trace_id: str) -> int:
+    return int.from_bytes(hashlib.blake2b(trace_id.encode(), digest_size=8).digest(), "little")
+
+def bytes_hash(data: bytes) -> int:
+    return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), "little")
+
+class LogIndex:
+    def __init__(self, log_path, index_path=None, sparse_every=SPARSE_EVERY):
+        self.log_path = log_path
+        self.index_path = index_path or log_path + ".idx"
+        self.sparse_every = sparse_every
+
+    # -------------------------
+    # Index file handling
+    # -------------------------
+    def _blocks(self):
+        """Return the live block descriptors (dicts)."""
+        return self._scan()[0]
+
+    def _scan(self):
+        """
+        Walk block headers; returns (live blocks, end of the last intact block, superseded bytes).
+        Stops at a torn/corrupt tail left by an interrupted write.
+        """
+        blocks, garbage = [], 0
+        if not os.path.exists(self.index_path):
+            return blocks, 0, garbage
+        size = os.path.getsize(self.index_path)
+        with open(self.index_path, "rb") as f:
+            pos = 0
+            while True:
+                hdr = f.read(HEADER.size)
+                if len(hdr) < HEADER.size:
+                    break
+                magic, start, end, n_ids, n_ts, min_ts, max_ts, inode, mtime_ns, head, tail = HEADER.unpack(hdr)
+                if magic != MAGIC:
+                    break
+                id_pos = pos + HEADER.size
+                ts_pos = id_pos + n_ids * ID_ENTRY.size
+                next_pos = ts_pos + n_ts * TS_ENTRY.size
+                if next_pos > size:
+                    break
+                while blocks and blocks[-1]["start"] >= start:
+                    old = blocks.pop()
+                    garbage += old["next_pos"] - old["hdr_pos"]
+                blocks.append({
+                    "hdr_pos": pos, "id_pos": id_pos, "n_ids": n_ids, "ts_pos": ts_pos, "n_ts": n_ts,
+                    "start": start, "end": end, "min_ts": min_ts, "max_ts": max_ts,
+                    "inode": inode, "mtime_ns": mtime_ns, "head": head, "tail": tail, "next_pos": next_pos,
+                })
+                pos = next_pos
+                f.seek(pos)
+        return blocks, pos, garbage
+
+    def indexed_upto(self):
+        blocks = self._blocks()
+        return blocks[-1]["end"] if blocks else 0
+
+    def _fingerprint(self, f, end):
+        """(head, tail) hashes of the first/last FINGERPRINT bytes of log[0:end]."""
+        f.seek(0)
+        head = bytes_hash(f.read(min(FINGERPRINT, end)))
+        f.seek(max(end - FINGERPRINT, 0))
+        tail = bytes_hash(f.read(min(FINGERPRINT, end)))
+        return head, tail
+
+    def _is_stale(self, last, st):
+        if st.st_ino != last["inode"] or st.st_size < last["end"]:
+            return True
+        if st.st_size == last["end"] and st.st_mtime_ns != last["mtime_ns"]:
+            return True  # rewritten with the same size
+        with open(self.log_path, "rb") as f:
+            return self._fingerprint(f, last["end"]) != (last["head"], last["tail"])
+
+    def _write_block(self, f, blk, ids, ts):
+        ids.sort()
+        f.write(HEADER.pack(MAGIC, blk["start"], blk["end"], len(ids), len(ts), blk["min_ts"], blk["max_ts"],
+                            blk["inode"], blk["mtime_ns"], blk["head"], blk["tail"]))
+        f.write(b"".join(ID_ENTRY.pack(h, off) for h, off in ids))
+        f.write(b"".join(TS_ENTRY.pack(mb, ma, off) for mb, ma, off in ts))
+
+    def update(self):
+        """Index lines appended since the last update; returns the number of new lines indexed."""
+        if not os.path.exists(self.log_path):
+            return 0
+        st = os.stat(self.log_path)
+        blocks, valid_end, _ = self._scan()
+        if blocks and self._is_stale(blocks[-1], st):
+            # log truncated / rotated / rewritten: rebuild from scratch
+            os.remove(self.index_path)
+            blocks = []
+        elif os.path.exists(self.index_path) and os.path.getsize(self.index_path) > valid_end:
+            # drop a torn block from an interrupted write; readers never map past valid_end
+            with open(self.index_path, "r+b") as f:
+                f.truncate(valid_end)
+        start = blocks[-1]["end"] if blocks else 0
+        if st.st_size == start:
+            return 0
+
+        running_max = blocks[-1]["max_ts"] if blocks else -INF
+        block_min = INF
+        ids, ts = [], []   # ts entries collected as [max_before, min_after, offset]
+        off, n = start, 0
+        with open(self.log_path, "rb") as f:
+            f.seek(start)
+            for raw in f:
+                if not raw.endswith(b"\n"):
+                    break  # partial line still being written
+                if n % self.sparse_every == 0:
+                    ts.append([running_max, INF, off])
+                try:
+                    rec = json.loads(raw)
+                except ValueError:
+                    rec = None
+                if isinstance(rec, dict):
+                    if rec.get("trace_id"):
+                        ids.append((trace_hash(str(rec["trace_id"])), off))
+                    epoch = to_epoch(rec.get("timestamp"))
+                    if epoch is not None:
+                        running_max = max(running_max, epoch)
+                        block_min = min(block_min, epoch)
+                        ts[-1][1] = min(ts[-1][1], epoch)
+                off += len(raw)
+                n += 1
+            if off == start:
+                return 0
+            head, tail = self._fingerprint(f, off)
+            mtime_ns = os.fstat(f.fileno()).st_mtime_ns  # after reading, so a quiet log compares equal next time
+        # turn per-step minima into suffix minima within the block
+        for i in range(len(ts) - 2, -1, -1):
+            ts[i][1] = min(ts[i][1], ts[i + 1][1])
+        blk = {"start": start, "end": off, "min_ts": block_min, "max_ts": running_max,
+               "inode": st.st_ino, "mtime_ns": mtime_ns, "head": head, "tail": tail}
+        with open(self.index_path, "ab") as f:
+            self._write_block(f, blk, ids, ts)
+        self._merge_tail()
+        return n
+
+    def _load_block(self, f, blk):
+        f.seek(blk["id_pos"])
+        data = f.read(blk["next_pos"] - blk["id_pos"])
+        return self._read_block(data, {**blk, "id_pos": 0, "ts_pos": blk["ts_pos"] - blk["id_pos"]})
+
+    def _read_block(self, data, blk):
+        ids = list(ID_ENTRY.iter_unpack(data[blk["id_pos"]:blk["ts_pos"]]))
+        ts = [list(e) for e in TS_ENTRY.iter_unpack(data[blk["ts_pos"]:blk["ts_pos"] + blk["n_ts"] * TS_ENTRY.size])]
+        return ids, ts
+
+    def _merge_tail(self):
+        """
+        Size-tiered merge: while the two newest blocks are of similar size, append their
+        merge, which supersedes them. Nothing already written is modified in place.
+        """
+        while True:
+            blocks, _, garbage = self._scan()
+            if len(blocks) < 2:
+                break
+            older, newer = blocks[-2], blocks[-1]
+            if older["n_ids"] + older["n_ts"] > MERGE_RATIO * (newer["n_ids"] + newer["n_ts"]):
+                break
+            with open(self.index_path, "rb") as f:
+                ids_a, ts_a = self._load_block(f, older)
+                ids_b, ts_b = self._load_block(f, newer)
+            for e in ts_a:  # older entries' suffix minima now extend over the newer block
+                e[1] = min(e[1], newer["min_ts"])
+            merged = {**newer, "start": older["start"], "min_ts": min(older["min_ts"], newer["min_ts"])}
+            with open(self.index_path, "ab") as f:
+                self._write_block(f, merged, ids_a + ids_b, ts_a + ts_b)
+        live = sum(b["next_pos"] - b["hdr_pos"] for b in blocks)
+        if garbage > max(live, MIN_RECLAIM):
+            self.compact()
+
+    def compact(self):
+        """Merge all live blocks into one sorted block, dropping superseded ones (tmp file + os.replace)."""
+        blocks = self._blocks()
+        if not blocks:
+            return
+        with open(self.index_path, "rb") as f:
+            data = f.read()
+        ids, ts = [], []
+        for i, blk in enumerate(blocks):
+            b_ids, b_ts = self._read_block(data, blk)
+            later_min = min((b["min_ts"] for b in blocks[i + 1:]), default=INF)
+            for e in b_ts:
+                e[1] = min(e[1], later_min)
+            ids.extend(b_ids)
+            ts.extend(b_ts)
+        merged = {**blocks[-1], "start": blocks[0]["start"], "min_ts": min(b["min_ts"] for b in blocks)}
+        tmp = self.index_path + ".tmp"
+        with open(tmp, "wb") as f:
+            self._write_block(f, merged, ids, ts)
+        os.replace(tmp, self.index_path)
+
+    # -------------------------
+    # Reader
+    # -------------------------
+    def open(self):
+        return LogReader(self)
+
+class LogReader:
+    """mmap-backed reader; decodes only the lines the index points at."""
+
+    def __init__(self, index: LogIndex):
+        self.index = index
+        self.blocks = index._blocks()
+        self.end = self.blocks[-1]["end"] if self.blocks else 0
+        self._files = []
+        self.log = self._mmap(index.log_path)
+        self.idx = self._mmap(index.index_path)
+        self._ts = None
+
+    def _mmap(self, path):
+        if not os.path.exists(path) or os.path.getsize(path) == 0:
+            return None
+        f = open(path, "rb")
+        self._files.append(f)
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def close(self):
+        for m in (self.log, self.idx):
+            if m is not None:
+                m.close()
+        for f in self._files:
+            f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def line_at(self, off):
+        """Decode the line starting at off; None if off is not a line start or the line is not JSON."""
+        if off >= len(self.log) or (off > 0 and self.log[off - 1:off] != b"\n"):
+            return None
+        end = self.log.find(b"\n", off)
+        try:
+            rec = json.loads(self.log[off:end if end != -1 else len(self.log)])
+        except ValueError:
+            return None
+        return rec if isinstance(rec, dict) else None
+
+    def _offsets_for_hash(self, h):
+        for blk in self.blocks:
+            id_pos, n_ids = blk["id_pos"], blk["n_ids"]
+            lo, hi = 0, n_ids
+            while lo < hi:  # lower bound binary search over the sorted block
+                mid = (lo + hi) // 2
+                if ID_ENTRY.unpack_from(self.idx, id_pos + mid * ID_ENTRY.size)[0] < h:
+                    lo = mid + 1
+                else:
+                    hi = mid
+            while lo < n_ids:
+                eh, off = ID_ENTRY.unpack_from(self.idx, id_pos + lo * ID_ENTRY.size)
+                if eh != h:
+                    break
+                yield off
+                lo += 1
+
+    def lookup(self, trace_id):
+        """All records with this trace_id, in file order."""
+        if self.log is None or self.idx is None:
+            return []
+        out = []
+        for off in sorted(self._offsets_for_hash(trace_hash(trace_id))):
+            rec = self.line_at(off)
+            if rec is not None and rec.get("trace_id") == trace_id:  # guard against hash collisions
+                out.append(rec)
+        return out
+
+    def _sparse_ts(self):
+        """Sparse entries in file order as (max_before, min_after, offset), both keys monotone non-decreasing."""
+        if self._ts is None:
+            self._ts = []
+            for i, blk in enumerate(self.blocks):
+                later_min = min((b["min_ts"] for b in self.blocks[i + 1:]), default=INF)
+                for k in range(blk["n_ts"]):
+                    mb, ma, off = TS_ENTRY.unpack_from(self.idx, blk["ts_pos"] + k * TS_ENTRY.size)
+                    self._ts.append((mb, min(ma, later_min), off))
+        return self._ts
+
+    def range(self, start=None, end=None):
+        """
+        Yield records with start <= timestamp <= end, in file order.
+        The scan starts at the last sparse point before which every line is < start and
+        stops at the first one from which every line is > end, so out-of-order timestamps
+        only widen the decoded byte window, never drop records.
+        """
+        if self.log is None:
+            return
+        ts = self._sparse_ts()
+        lo_off, hi_off = 0, self.end
+        if ts and start is not None:
+            i = bisect.bisect_left([mb for mb, _, _ in ts], start)
+            lo_off = ts[i - 1][2] if i > 0 else 0
+        if ts and end is not None:
+            j = bisect.bisect_right([ma for _, ma, _ in ts], end)
+            if j < len(ts):
+                hi_off = ts[j][2]
+        off = lo_off
+        while off < hi_off:
+            nl = self.log.find(b"\n", off, hi_off)
+            nl = hi_off if nl == -1 else nl
+            try:
+                rec = json.loads(self.log[off:nl])
+            except ValueError:
+                rec = None
+            off = nl + 1
+            if not isinstance(rec, dict):
+                continue
+            t = to_epoch(rec.get("timestamp"))
+            if t is None or (start is not None and t < start) or (end is not None and t > end):
+                continue
+            yield rec
+
+def main():
+    p = argparse.ArgumentParser(description="Sidecar offset index for JSONL logs")
+    sub = p.add_subparsers(dest="cmd", required=True)
+    b = sub.add_parser("build", help="create/refresh the index (incremental)")
+    b.add_argument("log")
+    g = sub.add_parser("get", help="print records for a trace_id")
+    g.add_argument("log")
+    g.add_argument("trace_id")
+    r = sub.add_parser("range", help="print records in a time range (epoch or ISO8601)")
+    r.add_argument("log")
+    r.add_argument("--start")
+    r.add_argument("--end")
+    c = sub.add_parser("compact", help="merge the index into a single block and reclaim superseded space")
+    c.add_argument("log")
+    args = p.parse_args()
+
+    if not os.path.exists(args.log):
+        print(f"ERROR: log file not found: {args.log}")
+        sys.exit(1)
+
+    index = LogIndex(args.log)
+    t0 = time.time()
+    n = index.update()
+    if args.cmd == "build":
+        print(f"[+] Indexed {n} new lines of {args.log} -> {index.index_path} ({time.time() - t0:.3f}s)")
+        return
+    if args.cmd == "compact":
+        before = os.path.getsize(index.index_path) if os.path.exists(index.index_path) else 0
+        index.compact()
+        after = os.path.getsize(index.index_path) if os.path.exists(index.index_path) else 0
+        print(f"[+] Compacted {index.index_path}: {before} -> {after} bytes ({time.time() - t0:.3f}s)")
+        return
+
+    t0 = time.time()
+    with index.open() as reader:
+        if args.cmd == "get":
+            recs = reader.lookup(args.trace_id)
+        else:
+            conv = lambda v: None if v is None else (float(v) if v.replace(".", "", 1).isdigit() else to_epoch(v))
+            recs = list(reader.range(conv(args.start), conv(args.end)))
+        for rec in recs:
+            print(json.dumps(rec))
+    print(f"[+] {len(recs)} records ({(time.time() - t0) * 1000:.1f} ms)", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,14 @@
 #!/usr/bin/env python3
 """
-Normalize DB queries and correlate HTTP <-> DB traces.
+Normalize DB queries and correlate orchestrator results <-> HTTP <-> DB traces.
+Every request is stamped with X-Trace-ID by the orchestrator, so correlation is a
+single streaming hash join on trace_id (no timestamp heuristics).
 Outputs logs/combined_trace.jsonl
 """
 import re, json, time, os
 from datetime import datetime
 
+RESULTS_LOG = "sqli_results.jsonl"
 HTTP_LOG = "logs/traces.jl"
 DB_LOG   = "logs/db_traces.jsonl"
 OUT_FILE = "logs/combined_trace.jsonl"
@@ -22,41 +25,51 @@ def normalize_sql(q):
     q = re.sub(r"\s+", " ", q).strip()
     return q
 
-def load_jsonl(path):
+def iter_jsonl(path):
+    """Stream records one line at a time (skips blank/corrupt lines)."""
     if not os.path.exists(path):
-        return []
+        return
     with open(path, "r", encoding="utf-8", errors="ignore") as f:
-        return [json.loads(x) for x in f if x.strip()]
+        for x in f:
+            if not x.strip():
+                continue
+            try:
+                yield json.loads(x)
+            except ValueError:
+                continue
 
-def correlate():
-    http = {h["trace_id"]: h for h in load_jsonl(HTTP_LOG) if "trace_id" in h}
-    dbs = load_jsonl(DB_LOG)
-    out = []
+def load_by_trace_id(path):
+    return {r["trace_id"]: r for r in iter_jsonl(path) if r.get("trace_id")}
 
-    for d in dbs:
-        d["normalized_query"] = normalize_sql(d.get("query"))
-        tid = d.get("trace_id")
-        if tid and tid in http:
-            combined = {**http[tid], **d}
-            combined["_correlation"] = "trace_id"
-            out.append(combined)
-        else:
-            # fallback: nearest timestamp
-            best = None
-            if d.get("timestamp"):
-                for tid2, h in http.items():
-                    if abs(d["timestamp"] - h["timestamp"]) < 2:
-                        best = h
-                        break
-            if best:
-                combined = {**best, **d}
-                combined["_correlation"] = "time_window"
-                out.append(combined)
+def correlate():
+    # build side: HTTP traces and orchestrator results keyed by trace_id
+    http = load_by_trace_id(HTTP_LOG)
+    results = load_by_trace_id(RESULTS_LOG)
+    # probe side: DB log is streamed and joined record by record
+    n = 0
+    no_trace_id = unknown_trace_id = 0
     os.makedirs(os.path.dirname(OUT_FILE), exist_ok=True)
     with open(OUT_FILE, "w", encoding="utf-8") as f:
-        for r in out:
-            f.write(json.dumps(r) + "\n")
-    print(f"[+] Combined {len(out)} correlated traces → {OUT_FILE}")
+        for d in iter_jsonl(DB_LOG):
+            tid = d.get("trace_id")
+            if not tid:
+                no_trace_id += 1
+                continue
+            if tid not in http:
+                unknown_trace_id += 1
+                continue
+            d["normalized_query"] = normalize_sql(d.get("query"))
+            combined = {**http[tid], **d}
+            combined["_correlation"] = "trace_id"
+            if tid in results:
+                combined["result"] = results[tid]
+            f.write(json.dumps(combined) + "\n")
+            n += 1
+    print(f"[+] Combined {n} correlated traces → {OUT_FILE}")
+    if no_trace_id or unknown_trace_id:
+        print(f"[!] Dropped {no_trace_id + unknown_trace_id} unmatched DB rows "
+              f"({no_trace_id} without trace_id, {unknown_trace_id} with no HTTP trace)")
+    return {"combined": n, "no_trace_id": no_trace_id, "unknown_trace_id": unknown_trace_id}
 
 if __name__ == "__main__":
     correlate()
@@ -0,0 +1,105 @@
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "scripts"))
+import live_aggregator  # noqa: E402
+
+NOW = 1_800_000_000.0  # fixed wall clock, on a minute boundary
+
+def write_log(path, records, mode="a"):
+    with open(path, mode) as f:
+        for r in records:
+            f.write(json.dumps(r) + "\n")
+
+def result(ts, verdict="no-evidence", **kw):
+    return {"timestamp": ts, "id_param": "1", "verdict": verdict, "status_code": 200, "elapsed_ms": 14, **kw}
+
+def trace(ts):
+    return {"timestamp": ts, "response": {"status": 200, "response_time_ms": 5.0}}
+
+def make(tmp_path, clock=lambda: NOW):
+    return live_aggregator.Aggregator(str(tmp_path / "results.jsonl"), str(tmp_path / "traces.jl"),
+                                      str(tmp_path / "state.json"), window_minutes=15, clock=clock)
+
+def test_restart_resumes_from_checkpoint(tmp_path):
+    write_log(tmp_path / "results.jsonl", [result(NOW - 10, "POSSIBLE_SQLI (error-based)", category="error")])
+    agg = make(tmp_path)
+    assert agg.poll() == 1
+    agg.checkpoint()
+
+    write_log(tmp_path / "results.jsonl", [result(NOW - 5)])
+    agg = make(tmp_path)
+    assert agg.poll() == 1  # only the appended line is read
+    st = agg.status()
+    assert st["totals"]["results"] == 2
+    assert st["window"]["findings_by_family"] == {"error": 1}
+
+def test_partial_trailing_line_waits_for_newline(tmp_path):
+    path = tmp_path / "results.jsonl"
+    write_log(path, [result(NOW - 10)])
+    with open(path, "a") as f:
+        f.write(json.dumps(result(NOW - 5))[:20])
+    agg = make(tmp_path)
+    assert agg.poll() == 1
+    with open(path, "a") as f:
+        f.write(json.dumps(result(NOW - 5))[20:] + "\n")
+    assert agg.poll() == 1
+    assert agg.status()["totals"]["results"] == 2
+
+def test_truncation_restarts_from_beginning(tmp_path):
+    path = tmp_path / "results.jsonl"
+    write_log(path, [result(NOW - 10)] * 5)
+    agg = make(tmp_path)
+    assert agg.poll() == 5
+    write_log(path, [result(NOW - 5)], mode="w")
+    assert agg.poll() == 1
+    assert agg.sources["results"]["offset"] == os.path.getsize(path)
+
+def test_window_expires_with_wall_clock(tmp_path):
+    clock = [NOW]
+    write_log(tmp_path / "results.jsonl", [result(NOW - 30)])
+    agg = make(tmp_path, clock=lambda: clock[0])
+    agg.poll()
+    assert agg.status()["window"]["results"] == 1
+    clock[0] = NOW + 20 * 60  # scan stopped 20 minutes ago
+    st = agg.status()
+    assert st["window"]["results"] == 0
+    assert st["totals"]["results"] == 1
+
+def test_future_timestamp_does_not_pin_window(tmp_path):
+    write_log(tmp_path / "results.jsonl", [result(NOW * 1000), result(NOW - 30), result(NOW - 20)])
+    agg = make(tmp_path)
+    agg.poll()
+    agg.checkpoint()
+    st = make(tmp_path).status()
+    assert st["window"]["results"] == 2
+    assert st["totals"]["results"] == 3
+    assert st["future_events"] == 1
+
+def test_old_history_only_counts_in_totals(tmp_path):
+    write_log(tmp_path / "results.jsonl", [result(NOW - 86400 - i * 60) for i in range(500)])
+    agg = make(tmp_path)
+    agg.poll()
+    assert agg.windows == {}
+    assert agg.status()["totals"]["results"] == 500
+
+def test_proxy_rps_uses_covered_span(tmp_path):
+    # 120 requests spread over the last two minutes, window starts at the first data minute
+    write_log(tmp_path / "traces.jl", [trace(NOW - 120 + i) for i in range(120)])
+    agg = make(tmp_path)
+    agg.poll()
+    st = agg.status()
+    assert st["window_end"] - st["window_start"] == 120
+    assert st["window"]["proxy_rps"] == 1.0
+
+def test_latency_percentile_uses_bucket_midpoint():
+    h = live_aggregator.LatencyHistogram()
+    for ms in (12, 13, 14, 15, 16):
+        h.add(ms)
+    assert abs(h.percentile(50) - 14) / 14 < 0.025
+
+def test_html_escapes_log_values():
+    html = live_aggregator.html_table("Window", {"findings_by_id": {"<script>": 1}, "<b>": "x"})
+    assert "<script>" not in html and "<b>" not in html
+    assert "&lt;script&gt;" in html
@@ -0,0 +1,122 @@
+import json
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "scripts"))
+import log_index  # noqa: E402
+
+def write_log(path, records, mode="w"):
+    with open(path, mode) as f:
+        for r in records:
+            f.write(json.dumps(r) + "\n")
+
+def test_lookup_after_append(tmp_path):
+    log = str(tmp_path / "traces.jl")
+    write_log(log, [{"trace_id": f"t{i}", "timestamp": i} for i in range(100)])
+    idx = log_index.LogIndex(log)
+    assert idx.update() == 100
+    write_log(log, [{"trace_id": "t5", "timestamp": 200}], mode="a")
+    assert idx.update() == 1
+    with idx.open() as r:
+        assert [rec["timestamp"] for rec in r.lookup("t5")] == [5, 200]
+        assert r.lookup("missing") == []
+
+def test_rewrite_in_place_rebuilds_index(tmp_path):
+    # combined_trace.jsonl is rewritten with mode "w" on every correlation run
+    log = str(tmp_path / "combined_trace.jsonl")
+    write_log(log, [{"trace_id": f"t{i}", "timestamp": i} for i in range(50)])
+    idx = log_index.LogIndex(log)
+    idx.update()
+    write_log(log, [{"trace_id": f"u{i}", "timestamp": i, "pad": "xx"} for i in range(50)])
+    idx.update()
+    with idx.open() as r:
+        assert r.lookup("u5")[0]["trace_id"] == "u5"
+        assert r.lookup("t5") == []
+
+def test_line_at_rejects_non_line_boundary(tmp_path):
+    log = str(tmp_path / "traces.jl")
+    write_log(log, [{"trace_id": "t0", "timestamp": 0}])
+    idx = log_index.LogIndex(log)
+    idx.update()
+    with idx.open() as r:
+        assert r.line_at(0)["trace_id"] == "t0"
+        assert r.line_at(3) is None
+
+def test_range_with_out_of_order_timestamps(tmp_path):
+    log = str(tmp_path / "traces.jl")
+    rnd = random.Random(7)
+    recs = [{"trace_id": f"t{i}", "timestamp": i + rnd.uniform(-40, 40)} for i in range(3000)]
+    idx = log_index.LogIndex(log, sparse_every=16)
+    for k in range(0, len(recs), 250):  # several incremental updates -> several blocks / merges
+        write_log(log, recs[k:k + 250], mode="a")
+        idx.update()
+    assert len(idx._blocks()) <= 6
+    with idx.open() as r:
+        got = sorted(rec["trace_id"] for rec in r.range(1000, 1100))
+    want = sorted(rec["trace_id"] for rec in recs if 1000 <= rec["timestamp"] <= 1100)
+    assert got == want
+
+def test_merges_only_append_to_the_index(tmp_path, monkeypatch):
+    monkeypatch.setattr(log_index, "MIN_RECLAIM", 1 << 30)  # keep superseded blocks around
+    log = str(tmp_path / "traces.jl")
+    idx = log_index.LogIndex(log)
+    write_log(log, [{"trace_id": f"t{i}", "timestamp": i} for i in range(10)])
+    idx.update()
+    with open(idx.index_path, "rb") as f:
+        before = f.read()
+    write_log(log, [{"trace_id": f"u{i}", "timestamp": 100 + i} for i in range(10)], mode="a")
+    idx.update()  # equal-sized blocks -> merged
+    with open(idx.index_path, "rb") as f:
+        after = f.read()
+    assert after.startswith(before)
+    assert len(idx._blocks()) == 1
+    with idx.open() as r:
+        assert r.lookup("t3")[0]["timestamp"] == 3
+        assert r.lookup("u3")[0]["timestamp"] == 103
+
+def test_torn_tail_is_dropped_on_update(tmp_path):
+    log = str(tmp_path / "traces.jl")
+    idx = log_index.LogIndex(log)
+    write_log(log, [{"trace_id": f"t{i}", "timestamp": i} for i in range(10)])
+    idx.update()
+    with open(idx.index_path, "ab") as f:  # header of a block whose entries never made it to disk
+        f.write(log_index.HEADER.pack(log_index.MAGIC, 0, 10 ** 6, 1000, 0, 0.0, 0.0, 0, 0, 0, 0))
+    assert len(idx._blocks()) == 1
+    write_log(log, [{"trace_id": "u1", "timestamp": 50}], mode="a")
+    assert idx.update() == 1
+    with idx.open() as r:
+        assert r.lookup("t3")[0]["timestamp"] == 3
+        assert r.lookup("u1")[0]["timestamp"] == 50
+
+def test_superseded_blocks_are_reclaimed(tmp_path, monkeypatch):
+    monkeypatch.setattr(log_index, "MIN_RECLAIM", 0)
+    log = str(tmp_path / "traces.jl")
+    idx = log_index.LogIndex(log)
+    for k in range(64):
+        write_log(log, [{"trace_id": f"t{k}", "timestamp": k}], mode="a")
+        idx.update()
+    live = sum(b["next_pos"] - b["hdr_pos"] for b in idx._blocks())
+    _, _, garbage = idx._scan()
+    assert garbage <= live  # compacted as soon as superseded bytes outweigh the live index
+    assert os.path.getsize(idx.index_path) <= 2 * live
+    with idx.open() as r:
+        assert all(r.lookup(f"t{k}")[0]["timestamp"] == k for k in range(64))
+
+def test_compact_merges_into_single_block(tmp_path, monkeypatch):
+    monkeypatch.setattr(log_index, "MIN_RECLAIM", 1 << 30)
+    log = str(tmp_path / "traces.jl")
+    idx = log_index.LogIndex(log, sparse_every=4)
+    for k in range(0, 100, 7):
+        write_log(log, [{"trace_id": f"t{i}", "timestamp": i} for i in range(k, min(k + 7, 100))], mode="a")
+        idx.update()
+    assert len(idx._blocks()) > 1
+    size_before = os.path.getsize(idx.index_path)
+    monkeypatch.setattr(sys, "argv", ["log_index.py", "compact", log])
+    log_index.main()
+    assert len(idx._blocks()) == 1
+    assert idx._scan()[2] == 0
+    assert os.path.getsize(idx.index_path) < size_before
+    with idx.open() as r:
+        assert r.lookup("t42")[0]["timestamp"] == 42
+        assert sorted(rec["timestamp"] for rec in r.range(10, 20)) == list(range(10, 21))
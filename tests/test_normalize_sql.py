@@ -0,0 +1,40 @@
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "scripts"))
+import normalize_sql  # noqa: E402
+
+T1 = "8f8b27d2-1abf-4a60-9f78-9e4d45ad00a1"
+T2 = "1c9e0f3a-5b7d-4e2f-8a6c-3d4b5e6f7a8b"
+
+def write_log(path, records):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w") as f:
+        for r in records:
+            f.write(json.dumps(r) + "\n")
+
+def test_correlate_joins_on_trace_id(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    write_log(normalize_sql.HTTP_LOG, [
+        {"trace_id": T1, "timestamp": "2025-11-09T09:32:15Z", "payload": {"payload_id": "bool-true"}},
+        {"trace_id": T2, "timestamp": "2025-11-09T09:32:16Z", "payload": {"payload_id": "err-squote"}},
+    ])
+    write_log(normalize_sql.RESULTS_LOG, [{"trace_id": T1, "verdict": "no-evidence"}])
+    write_log(normalize_sql.DB_LOG, [
+        {"trace_id": T1, "query": f"SELECT * FROM users WHERE user_id = '1' /* trace_id={T1} */"},
+        {"trace_id": T2, "query": f"SELECT * FROM users WHERE user_id = '2' /* trace_id={T2} */"},
+        {"trace_id": None, "query": "SELECT 1", "timestamp": 1762680735.0},
+        {"trace_id": "deadbeef-0000-4000-8000-000000000000", "query": "SELECT 2"},
+    ])
+
+    stats = normalize_sql.correlate()
+
+    assert stats == {"combined": 2, "no_trace_id": 1, "unknown_trace_id": 1}
+    with open(normalize_sql.OUT_FILE) as f:
+        out = [json.loads(x) for x in f]
+    assert [r["trace_id"] for r in out] == [T1, T2]
+    assert out[0]["result"] == {"trace_id": T1, "verdict": "no-evidence"}
+    assert "result" not in out[1]
+    assert out[0]["normalized_query"].startswith("SELECT * FROM users WHERE user_id = ?")
+    assert all(r["_correlation"] == "trace_id" for r in out)
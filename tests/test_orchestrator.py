@@ -0,0 +1,94 @@
+import os
+import re
+import sys
+from urllib.parse import urlparse, parse_qs
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "attacker"))
+import orchestrator  # noqa: E402
+
+TARGET = "http://lab/vulnerabilities/sqli/?id={id}"
+LAYOUT = "<html><body><h1>Vulnerability: SQL Injection</h1>{rows}<footer>Damn Vulnerable Web Application</footer></body></html>"
+SQL_ERROR = "You have an error in your SQL syntax; check the manual that corresponds to your MySQL server version"
+
+class FakeResponse:
+    def __init__(self, text, status_code=200):
+        self.text = text
+        self.status_code = status_code
+
+class FakeClient:
+    """
+    Evaluates the id the way MySQL would for `WHERE user_id = <id>` (numeric)
+    or `WHERE user_id = '<id>'` (quoted, like DVWA), for a small users table.
+    """
+
+    def __init__(self, context, users):
+        self.context = context
+        self.users = users
+        self.requested = []
+
+    def _lookup(self, n):
+        name = self.users.get(n)
+        rows = f"<pre>ID: {n}<br />First name: {name}<br />Surname: {name}</pre>" if name else ""
+        return FakeResponse(LAYOUT.format(rows=rows))
+
+    def get(self, url, params=None, headers=None):
+        value = parse_qs(urlparse(url).query, keep_blank_values=True)["id"][0]
+        self.requested.append(value)
+        if self.context == "numeric":
+            m = re.fullmatch(r"(\d+)(?:-(\d+))?", value)
+            if not m:
+                return FakeResponse(SQL_ERROR)
+            return self._lookup(int(m.group(1)) - int(m.group(2) or 0))
+        # single-quoted literal: '' is an escaped quote, a lone ' ends the literal early
+        if re.search(r"(?<!')'(?!')", value.replace("''", "")):
+            return FakeResponse(SQL_ERROR)
+        m = re.match(r"\d+", value)  # MySQL casts the leading digits of the string
+        return self._lookup(int(m.group(0)) if m else 0)
+
+@pytest.fixture(autouse=True)
+def no_sleep(monkeypatch):
+    monkeypatch.setattr(orchestrator.time, "sleep", lambda s: None)
+
+def make_orchestrator(client):
+    return orchestrator.Orchestrator(TARGET, ["1"], client, orchestrator.PayloadGenerator(), orchestrator.Analyzer())
+
+def test_detect_context_quoted_dvwa_like():
+    # neighbouring users render nearly identical pages, so '2-1' -> user 2 looks "same"
+    client = FakeClient("single", {1: "admin", 2: "Gordon", 3: "Hack"})
+    orch = make_orchestrator(client)
+    base = client.get(TARGET.format(id="1")).text
+    assert orch.detect_context("1", base) == "single"
+
+def test_detect_context_numeric():
+    # neighbouring rows exist and look "same", so the control must not depend on them
+    client = FakeClient("numeric", {1: "admin", 2: "Gordon", 3: "Hack"})
+    orch = make_orchestrator(client)
+    base = client.get(TARGET.format(id="1")).text
+    assert orch.detect_context("1", base) == "numeric"
+
+def test_detect_context_inconclusive_returns_unknown():
+    client = FakeClient("single", {1: "admin"})
+    client.get = lambda url, params=None, headers=None: FakeResponse(LAYOUT.format(rows=""))
+    orch = make_orchestrator(client)
+    assert orch.detect_context("1", LAYOUT.format(rows="")) == orchestrator.UNKNOWN_CONTEXT
+
+def test_unknown_context_yields_union_of_contexts():
+    gen = orchestrator.PayloadGenerator()
+    items = list(gen.iter_payloads(orchestrator.UNKNOWN_CONTEXT))
+    payloads = [p["payload"] for p in items]
+    assert len(payloads) == len(set(payloads))
+    for ctx in orchestrator.CONTEXTS:
+        assert set(gen.all_payloads(ctx)) <= set(payloads)
+    assert {"bool-numeric", "bool-balanced"} <= {p["payload_id"] for p in items}
+
+def test_render_payload_keeps_literal_braces():
+    raw, encoded = orchestrator.render_payload("single", '{q} OR {fn NOW()} AND {"a": 1}{c}', 0)
+    assert raw == "' OR {fn NOW()} AND {\"a\": 1} -- "
+    assert "%7B" in encoded
+
+def test_quoted_context_keeps_quote_closing_payloads():
+    payload_ids = {p["payload_id"] for p in orchestrator.PayloadGenerator().iter_payloads("single")}
+    assert "bool-balanced" in payload_ids
+    assert "bool-numeric" not in payload_ids
@@ -0,0 +1,53 @@
+import json
+import os
+import sys
+from datetime import timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "proxy"))
+import app as proxy_app  # noqa: E402
+
+TRACE_ID = "8f8b27d2-1abf-4a60-9f78-9e4d45ad00a1"
+
+class FakeRaw:
+    headers = {"Content-Type": "text/html"}
+
+class FakeUpstream:
+    status_code = 200
+    content = b"<html>ok</html>"
+    text = "<html>ok</html>"
+    elapsed = timedelta(milliseconds=12)
+    raw = FakeRaw()
+
+def proxied_record(tmp_path, monkeypatch, headers):
+    log_path = str(tmp_path / "traces.jl")
+    monkeypatch.setattr(proxy_app, "LOG_PATH", log_path)
+    sent = {}
+
+    def fake_request(**kw):
+        sent.update(kw)
+        return FakeUpstream()
+
+    monkeypatch.setattr(proxy_app.requests, "request", fake_request)
+    resp = proxy_app.app.test_client().get("/vulnerabilities/sqli/?id=1", headers=headers)
+    assert resp.status_code == 200
+    with open(log_path) as f:
+        return json.loads(f.readline()), sent
+
+def test_orchestrator_headers_are_recorded(tmp_path, monkeypatch):
+    rec, sent = proxied_record(tmp_path, monkeypatch, {
+        "X-Trace-ID": TRACE_ID, "X-Payload-ID": "bool-true", "X-Payload-Category": "boolean",
+    })
+    assert rec["trace_id"] == TRACE_ID
+    assert rec["payload"]["payload_id"] == "bool-true"
+    assert rec["payload"]["category"] == "boolean"
+    assert rec["meta"]["tool"] == "orchestrator"
+    assert rec["meta"]["round"] == "orchestrator"
+    assert rec["response"]["response_time_ms"] == 12.0
+    assert sent["params"]["id"] == f"1 /* trace_id={TRACE_ID} */"
+
+def test_manual_traffic_gets_fresh_trace_id(tmp_path, monkeypatch):
+    rec, _ = proxied_record(tmp_path, monkeypatch, {})
+    assert len(rec["trace_id"]) == 36 and rec["trace_id"] != TRACE_ID
+    assert rec["payload"]["payload_id"] is None
+    assert rec["meta"]["tool"] == "manual"
+    assert rec["meta"]["round"] == "manual"
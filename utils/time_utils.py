@@ -0,0 +1,13 @@
+# utils/time_utils.py
+from datetime import datetime
+
+def to_epoch(ts):
+    """Accept epoch floats (orchestrator/db logs) or ISO strings (proxy logs)."""
+    if ts is None:
+        return None
+    if isinstance(ts, (int, float)):
+        return float(ts)
+    try:
+        return datetime.fromisoformat(str(ts).replace("Z", "+00:00")).timestamp()
+    except ValueError:
+        return None